@@ -90,6 +90,31 @@ router.post('/', conversationWriteRateLimiter, asyncHandler(async (req, res) =>
   });
 }));
 
+/**
+ * @route GET /api/conversations/detail/:conversationId
+ * @desc Get a single conversation by its ID
+ * @access Public
+ */
+router.get('/detail/:conversationId', asyncHandler(async (req, res) => {
+  const { conversationId } = req.params;
+
+  const conversation = await Conversation
+    .findOne({ conversationId })
+    .select('conversationId userId title status config isPinned pinnedAt createdAt updatedAt stats');
+
+  if (!conversation) {
+    return res.status(404).json({
+      success: false,
+      error: { message: 'Conversation not found' }
+    });
+  }
+
+  res.json({
+    success: true,
+    data: conversation
+  });
+}));
+
 /**
  * @route GET /api/conversations/:userId
  * @desc Get all conversations for a user
@@ -113,7 +138,7 @@ router.get('/:userId', asyncHandler(async (req, res) => {
     })
     .limit(parseInt(limit))
     .skip(parseInt(offset))
-    .select('conversationId title status isPinned pinnedAt createdAt updatedAt stats');
+    .select('conversationId title status config isPinned pinnedAt createdAt updatedAt stats');
 
   res.json({
     success: true,
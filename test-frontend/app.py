@@ -1,66 +1,331 @@
 #!/usr/bin/env python3
 
 import os
+import sys
 import json
+import hashlib
+import time
+import threading
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from requests_toolbelt.multipart.encoder import MultipartEncoder
+from urllib3.util.retry import Retry
 from datetime import datetime
-from flask import Flask, request, jsonify, render_template, session, redirect, url_for, flash, Response
+from flask import Flask, request, jsonify, render_template, session, redirect, url_for, flash, Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from flask_caching import Cache
+from flask_compress import Compress
+from flask_session import Session
 from werkzeug.utils import secure_filename
-import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson for faster jsonify/request parsing"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS).decode()
+    
+    def loads(self, s, **kwargs):
+        # Hooks such as the session serializer's object_hook need the stdlib parser
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.secret_key = 'your-secret-key-change-in-production'
 
 # Configuration
 # BACKEND_URL = 'http://localhost:5000/api'
 BACKEND_URL = 'https://apsara-backend.devshubh.me/api'
-UPLOAD_FOLDER = 'static/uploads'
-ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'mp3', 'mp4', 'wav', 'ogg'}
+ALLOWED_EXTENSIONS = frozenset({'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'mp3', 'mp4', 'wav', 'ogg'})
+
+# Match the backend's 100MB per-file limit
+app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024
+
+# Gzip JSON/HTML responses; leave streamed responses (SSE) unbuffered
+app.config['COMPRESS_STREAMS'] = False
+Compress(app)
+
+# Keep session data server-side in Redis when configured so the cookie only carries an id
+SESSION_REDIS_URL = os.environ.get('SESSION_REDIS_URL')
+if SESSION_REDIS_URL:
+    import redis
+    app.config.update(
+        SESSION_TYPE='redis',
+        SESSION_REDIS=redis.Redis.from_url(SESSION_REDIS_URL)
+    )
+    Session(app)
+
+# Short-lived cache for authenticated backend GETs. It needs a store shared by every
+# web worker and the Celery worker for write invalidation to work, so without Redis
+# caching is disabled.
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+BACKEND_CACHE_TIMEOUT = 30
+cache = Cache(app, config={
+    'CACHE_TYPE': 'RedisCache' if CACHE_REDIS_URL else 'NullCache',
+    'CACHE_REDIS_URL': CACHE_REDIS_URL,
+    'CACHE_DEFAULT_TIMEOUT': BACKEND_CACHE_TIMEOUT
+})
+
+# Shared HTTP session so backend calls reuse pooled keep-alive connections
+_SESSION = requests.Session()
+_SESSION.headers.update({'Accept': 'application/json'})
+_ADAPTER = HTTPAdapter(
+    pool_connections=50,
+    pool_maxsize=50,
+    # Status retries only for idempotent verbs; connection failures are retried for all.
+    # Read timeouts are not retried so a hung backend fails after a single timeout.
+    max_retries=Retry(
+        total=3,
+        read=0,
+        backoff_factor=0.3,
+        status_forcelist=[502, 503, 504],
+        allowed_methods=['GET', 'PUT', 'DELETE']
+    )
+)
+_SESSION.mount('http://', _ADAPTER)
+_SESSION.mount('https://', _ADAPTER)
+BACKEND_TIMEOUT = (3, 30)  # (connect, read) seconds
+UPLOAD_TIMEOUT = (5, 300)
+GENERATE_TIMEOUT = (3, 300)
 
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+class BackendUnavailableError(Exception):
+    """Raised instead of calling the backend while the circuit breaker is open"""
 
-# Ensure upload directory exists
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+class CircuitBreaker:
+    """Fail fast once the backend keeps failing instead of tying up workers on timeouts"""
+    
+    # Only transport errors and gateway statuses count; an application 500 such as a
+    # failed generation must not cut off every user
+    FAILURE_STATUSES = frozenset({502, 503, 504})
+    
+    def __init__(self, fail_max=5, reset_timeout=30):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+    
+    def _before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise BackendUnavailableError('Backend unavailable')
+            # Half-open: let calls through, but a single further failure reopens
+            self._opened_at = None
+            self._failures = self.fail_max - 1
+    
+    def _record(self, failed):
+        with self._lock:
+            if not failed:
+                self._failures = 0
+                return
+            self._failures += 1
+            if self._failures >= self.fail_max:
+                self._opened_at = time.monotonic()
+    
+    def call(self, func, *args, **kwargs):
+        # The call itself runs outside the lock so concurrent requests are not serialized
+        self._before_call()
+        try:
+            response = func(*args, **kwargs)
+        except requests.exceptions.RequestException:
+            self._record(True)
+            raise
+        self._record(response.status_code in self.FAILURE_STATUSES)
+        return response
+
+_BACKEND_BREAKER = CircuitBreaker(fail_max=5, reset_timeout=30)
+
+# Worker pool for issuing independent backend calls concurrently
+_EXECUTOR = ThreadPoolExecutor(max_workers=8)
+
+# Optional Celery queue for long-running AI generation (enabled when a broker is configured)
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL')
+MAX_PENDING_TASKS = 20
+celery = None
+if CELERY_BROKER_URL:
+    from celery import Celery
+    celery = Celery(
+        'apsara',
+        broker=CELERY_BROKER_URL,
+        backend=os.environ.get('CELERY_RESULT_BACKEND', CELERY_BROKER_URL)
+    )
 
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    dot = filename.rfind('.')
+    return dot != -1 and filename[dot + 1:].lower() in ALLOWED_EXTENSIONS
+
+_TIMESTAMP_KEYS = ('createdAt', 'updatedAt')
+
+if sys.version_info >= (3, 11):
+    def _parse_iso(value):
+        """Parse a backend ISO-8601 timestamp, returning None if it is malformed"""
+        # fromisoformat accepts a trailing 'Z' natively from 3.11
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+else:
+    def _parse_iso(value):
+        """Parse a backend ISO-8601 timestamp, returning None if it is malformed"""
+        try:
+            if value.endswith('Z'):
+                return datetime.fromisoformat(value[:-1] + '+00:00')
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+
+def convert_timestamps(items):
+    """Convert string timestamps to datetime objects for template compatibility"""
+    for item in items:
+        for key in _TIMESTAMP_KEYS:
+            value = item.get(key)
+            if type(value) is str:
+                item[key] = _parse_iso(value)
+    return items
 
-def make_backend_request(endpoint, method='GET', data=None, files=None, token=None):
+def _backend_cache_version_key(token):
+    return 'backend-version:' + hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+
+def conversations_cache_key(user_id, token):
+    """Key for the dashboard's conversation list, invalidated with the token's other cached GETs"""
+    version = cache.get(_backend_cache_version_key(token)) or 0
+    return f'convs:{user_id}:{version}'
+
+def backend_cache_key(url, token):
+    """Cache key for a backend GET, scoped to the token's current cache version"""
+    version = cache.get(_backend_cache_version_key(token)) or 0
+    digest = hashlib.blake2b(f'{version}:{token}:{url}'.encode(), digest_size=16).hexdigest()
+    return f'backend:{digest}'
+
+def invalidate_backend_cache(token):
+    """Drop all cached GETs for a token by bumping its cache version"""
+    version_key = _backend_cache_version_key(token)
+    # Outlive every entry cached under the previous version, then expire with the token
+    cache.set(version_key, (cache.get(version_key) or 0) + 1, timeout=2 * BACKEND_CACHE_TIMEOUT)
+
+@lru_cache(maxsize=1024)
+def auth_headers(token):
+    """Authorization headers for a token, built once and shared (do not mutate)"""
+    return {'Authorization': f'Bearer {token}'}
+
+def make_backend_request(endpoint, method='GET', data=None, files=None, token=None, timeout=BACKEND_TIMEOUT):
     """Make requests to the backend API"""
+    method = method.upper()
     url = f"{BACKEND_URL}/{endpoint.lstrip('/')}"
-    headers = {'Content-Type': 'application/json'}
-    
-    if token:
-        headers['Authorization'] = f'Bearer {token}'
+    # requests sets Content-Type itself for json= and multipart bodies
+    headers = auth_headers(token) if token else None
+    
+    # Serve repeated authenticated GETs from cache
+    cache_key = None
+    if method == 'GET' and token:
+        cache_key = backend_cache_key(url, token)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+    
+    kwargs = {'headers': headers, 'timeout': timeout}
+    if files:
+        # Stream multipart bodies chunk by chunk instead of building them in memory
+        encoder = MultipartEncoder(fields={**(data or {}), **files})
+        kwargs['data'] = encoder
+        kwargs['headers'] = {**(headers or {}), 'Content-Type': encoder.content_type}
+    elif data is not None:
+        kwargs['json'] = data
     
     try:
-        if method == 'GET':
-            response = requests.get(url, headers=headers)
-        elif method == 'POST':
-            if files:
-                # For file uploads, don't set Content-Type header
-                headers.pop('Content-Type', None)
-                response = requests.post(url, data=data, files=files, headers=headers)
-            else:
-                response = requests.post(url, json=data, headers=headers)
-        elif method == 'PUT':
-            response = requests.put(url, json=data, headers=headers)
-        elif method == 'DELETE':
-            response = requests.delete(url, headers=headers)
+        response = _BACKEND_BREAKER.call(_SESSION.request, method, url, **kwargs)
         
         # Handle HTTP error codes
         if response.status_code >= 400:
             try:
-                error_data = response.json()
+                error_data = orjson.loads(response.content)
                 error_msg = error_data.get('error', error_data.get('message', f'HTTP {response.status_code} error'))
                 return {'success': False, 'error': error_msg, 'status_code': response.status_code}
             except:
                 return {'success': False, 'error': f'HTTP {response.status_code} error', 'status_code': response.status_code}
         
-        return response.json()
+        # Tolerate empty bodies (e.g. 204) and non-JSON pages from intermediate proxies
+        if not response.content:
+            result = {'success': True}
+        else:
+            try:
+                result = orjson.loads(response.content)
+            except orjson.JSONDecodeError:
+                result = None
+            
+            if not isinstance(result, dict):
+                print(f"Invalid JSON from backend for {method} {endpoint}: {response.text[:256]}")
+                return {'success': False, 'error': 'Invalid JSON from backend'}
+        
+        if cache_key:
+            if result.get('success'):
+                cache.set(cache_key, result, timeout=BACKEND_CACHE_TIMEOUT)
+        elif token and method != 'GET':
+            # Writes may change anything this user has cached
+            invalidate_backend_cache(token)
+        
+        return result
+    except BackendUnavailableError:
+        return {'success': False, 'error': 'Backend unavailable'}
     except requests.exceptions.RequestException as e:
         return {'success': False, 'error': f'Network error: {str(e)}'}
 
+def is_missing_route(result):
+    """True for a 404 that did not come from the conversation detail route itself"""
+    if result.get('status_code') != 404:
+        return False
+    error = result.get('error')
+    return not (isinstance(error, dict) and error.get('message') == 'Conversation not found')
+
+def generate_ai(message_data, token):
+    """Call the backend AI generation endpoint"""
+    return make_backend_request('ai/generate', 'POST', message_data, token=token, timeout=GENERATE_TIMEOUT)
+
+if celery is not None:
+    generate_ai_task = celery.task(name='apsara.generate_ai')(generate_ai)
+
+def build_message_response(result):
+    """Shape a backend generation result for the chat UI and sync guest limitations"""
+    if not result.get('success'):
+        return {'success': False, 'error': result.get('error', 'Failed to send message')}
+    
+    is_guest = session['user']['role'] == 'guest'
+    
+    # Update guest limitations if user is a guest and backend provides usage info
+    if is_guest and result.get('usageInfo'):
+        guest_usage_info = result['usageInfo'].get('guestLimits', {})
+        if guest_usage_info:
+            # Update session with new guest limitations
+            session['guest_limitations'] = {
+                'totalMessagesLimit': guest_usage_info.get('totalMessages', 5),
+                'totalMessagesUsed': guest_usage_info.get('totalMessagesUsed', 0),
+                'remainingMessages': guest_usage_info.get('remainingMessages', 5)
+            }
+            session.modified = True
+    
+    return {
+        'success': True,
+        'userMessage': result.get('userMessage', {}),
+        'aiResponse': result.get('modelMessage', {}),
+        'thoughts': result.get('thoughts'),
+        'metadata': {
+            'tokens': result.get('usageMetadata', {}),
+            'model': result.get('model'),
+            'provider': result.get('provider')
+        },
+        'updatedGuestLimitations': session.get('guest_limitations') if is_guest else None
+    }
+
+def sse_event(payload):
+    """Encode a payload as a single Server-Sent Events data frame"""
+    return b'data: ' + orjson.dumps(payload) + b'\n\n'
+
 @app.route('/')
 def index():
     """Home page - redirect based on authentication status"""
@@ -148,6 +413,8 @@ def guest_login():
 @app.route('/logout')
 def logout():
     """User logout"""
+    if 'user' in session:
+        cache.delete(conversations_cache_key(session['user']['id'], session.get('token', '')))
     session.clear()
     flash('You have been logged out successfully', 'info')
     return redirect(url_for('index'))
@@ -159,8 +426,9 @@ def dashboard():
         return redirect(url_for('index'))
     
     # Get user's conversations
+    user = session['user']
     token = session.get('token')
-    user_id = session['user']['id']
+    user_id = user['id']
     
     # Try to get conversations, but handle if endpoint doesn't exist yet
     conversations = []
@@ -170,26 +438,19 @@ def dashboard():
             # Backend returns conversations in data field as an array
             conversations = conversations_result.get('data', [])
             
-            # Convert string timestamps to datetime objects for template compatibility
-            from datetime import datetime
-            for conversation in conversations:
-                if conversation.get('createdAt') and isinstance(conversation['createdAt'], str):
-                    try:
-                        conversation['createdAt'] = datetime.fromisoformat(conversation['createdAt'].replace('Z', '+00:00'))
-                    except:
-                        conversation['createdAt'] = None
-                if conversation.get('updatedAt') and isinstance(conversation['updatedAt'], str):
-                    try:
-                        conversation['updatedAt'] = datetime.fromisoformat(conversation['updatedAt'].replace('Z', '+00:00'))
-                    except:
-                        conversation['updatedAt'] = None
+            convert_timestamps(conversations)
+            
+            # Remember the list so opening a conversation can skip the detail fetch
+            cache.set(conversations_cache_key(user_id, token),
+                      {c['conversationId']: c for c in conversations if c.get('conversationId')},
+                      timeout=BACKEND_CACHE_TIMEOUT)
         else:
             print(f"Failed to fetch conversations: {conversations_result.get('error')}")
     except Exception as e:
         print(f"Error fetching conversations: {e}")
     
     return render_template('dashboard.html', 
-                         user=session['user'], 
+                         user=user, 
                          conversations=conversations,
                          guest_limitations=session.get('guest_limitations'))
 
@@ -199,53 +460,47 @@ def conversation_view(conversation_id):
     if 'user' not in session:
         return redirect(url_for('index'))
     
+    user = session['user']
     token = session.get('token')
-    user_id = session['user']['id']
+    user_id = user['id']
+    
+    # Fetch messages in the background while resolving the conversation itself
+    messages_future = _EXECUTOR.submit(make_backend_request, f'conversations/{conversation_id}/messages', 'GET', token=token)
     
-    # Get conversation details by finding it in user's conversations
-    conversations_result = make_backend_request(f'conversations/{user_id}', 'GET', token=token)
-    conversation = None
+    # Reuse the conversation list cached by the dashboard when it has this conversation
+    cached_conversations = cache.get(conversations_cache_key(user_id, token)) or {}
+    conversation = cached_conversations.get(conversation_id)
     
-    if conversations_result.get('success'):
-        conversations = conversations_result.get('data', [])
-        conversation = next((c for c in conversations if c.get('conversationId') == conversation_id), None)
+    if conversation is None:
+        conversation_result = make_backend_request(f'conversations/detail/{conversation_id}', 'GET', token=token)
+        conversation = conversation_result.get('data') if conversation_result.get('success') else None
+        
+        # The detail endpoint returns any conversation, so only show the user's own
+        if conversation is not None and conversation.get('userId') != user_id:
+            conversation = None
+        
+        # Fall back to scanning the user's conversations if the backend lacks the detail endpoint
+        if conversation is None and is_missing_route(conversation_result):
+            conversations_result = make_backend_request(f'conversations/{user_id}', 'GET', token=token)
+            if conversations_result.get('success'):
+                conversations = conversations_result.get('data', [])
+                conversation = next((c for c in conversations if c.get('conversationId') == conversation_id), None)
+    
+    messages_result = messages_future.result()
     
     if not conversation:
         flash('Conversation not found', 'error')
         return redirect(url_for('dashboard'))
     
     # Get conversation messages
-    messages_result = make_backend_request(f'conversations/{conversation_id}/messages', 'GET', token=token)
     messages = messages_result.get('data', []) if messages_result.get('success') else []
     
     # Convert string timestamps to datetime objects for template compatibility
-    from datetime import datetime
-    for message in messages:
-        if message.get('createdAt') and isinstance(message['createdAt'], str):
-            try:
-                message['createdAt'] = datetime.fromisoformat(message['createdAt'].replace('Z', '+00:00'))
-            except:
-                message['createdAt'] = None
-        if message.get('updatedAt') and isinstance(message['updatedAt'], str):
-            try:
-                message['updatedAt'] = datetime.fromisoformat(message['updatedAt'].replace('Z', '+00:00'))
-            except:
-                message['updatedAt'] = None
-    
-    # Also convert conversation timestamps
-    if conversation.get('createdAt') and isinstance(conversation['createdAt'], str):
-        try:
-            conversation['createdAt'] = datetime.fromisoformat(conversation['createdAt'].replace('Z', '+00:00'))
-        except:
-            conversation['createdAt'] = None
-    if conversation.get('updatedAt') and isinstance(conversation['updatedAt'], str):
-        try:
-            conversation['updatedAt'] = datetime.fromisoformat(conversation['updatedAt'].replace('Z', '+00:00'))
-        except:
-            conversation['updatedAt'] = None
+    convert_timestamps(messages)
+    convert_timestamps([conversation])
     
     return render_template('conversation.html', 
-                         user=session['user'],
+                         user=user,
                          conversation=conversation,
                          messages=messages,
                          guest_limitations=session.get('guest_limitations'))
@@ -322,31 +577,23 @@ def upload_file():
     if not allowed_file(file.filename):
         return jsonify({'success': False, 'error': 'File type not allowed'})
     
-    # Save file temporarily for upload to backend
+    user_id = session['user']['id']
     filename = secure_filename(file.filename)
-    temp_filename = f"{uuid.uuid4()}_{filename}"
-    temp_path = os.path.join(app.config['UPLOAD_FOLDER'], temp_filename)
-    file.save(temp_path)
     
     try:
-        # Upload to backend
+        # Stream the upload straight to the backend without a temp file
         storage_method = request.form.get('storageMethod', 'google-file-api')
-        user_id = session['user']['id']
         conversation_id = request.form.get('conversationId', '')
         
-        with open(temp_path, 'rb') as f:
-            files = {'files': (filename, f, file.content_type)}
-            data = {
-                'storageMethod': storage_method,
-                'userId': user_id,
-                'conversationId': conversation_id,
-                'displayName': filename
-            }
-            
-            result = make_backend_request('files/upload', 'POST', data=data, files=files)
+        files = {'files': (filename, file.stream, file.content_type)}
+        data = {
+            'storageMethod': storage_method,
+            'userId': user_id,
+            'conversationId': conversation_id,
+            'displayName': filename
+        }
         
-        # Clean up temp file
-        os.remove(temp_path)
+        result = make_backend_request('files/upload', 'POST', data=data, files=files, timeout=UPLOAD_TIMEOUT)
         
         if result.get('success'):
             uploaded_file = result['files'][0]
@@ -363,9 +610,6 @@ def upload_file():
             return jsonify({'success': False, 'error': result.get('error', 'Upload failed')})
     
     except Exception as e:
-        # Clean up temp file on error
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/send-message', methods=['POST'])
@@ -375,10 +619,11 @@ def send_message():
         return jsonify({'success': False, 'error': 'Not authenticated'})
     
     data = request.get_json()
+    user_id = session['user']['id']
     token = session.get('token')
     
     message_data = {
-        'userId': session['user']['id'],
+        'userId': user_id,
         'conversationId': data['conversationId'],
         'contents': data['message'],
         'model': data.get('model', 'gemini-2.5-flash'),
@@ -397,35 +642,39 @@ def send_message():
     if data.get('files'):
         message_data['files'] = data['files']
     
-    result = make_backend_request('ai/generate', 'POST', message_data, token=token)
+    # Hand off to the task queue when available so the worker is not blocked on the LLM
+    if celery is not None:
+        task = generate_ai_task.delay(message_data, token)
+        # Remember the task on this user's session so only they can collect it
+        session['pending_tasks'] = (session.get('pending_tasks', []) + [task.id])[-MAX_PENDING_TASKS:]
+        return jsonify({'success': True, 'taskId': task.id})
     
-    if result.get('success'):
-        # Update guest limitations if user is a guest and backend provides usage info
-        if session['user']['role'] == 'guest' and result.get('usageInfo'):
-            guest_usage_info = result['usageInfo'].get('guestLimits', {})
-            if guest_usage_info:
-                # Update session with new guest limitations
-                session['guest_limitations'] = {
-                    'totalMessagesLimit': guest_usage_info.get('totalMessages', 5),
-                    'totalMessagesUsed': guest_usage_info.get('totalMessagesUsed', 0),
-                    'remainingMessages': guest_usage_info.get('remainingMessages', 5)
-                }
-                session.modified = True
-        
-        return jsonify({
-            'success': True,
-            'userMessage': result.get('userMessage', {}),
-            'aiResponse': result.get('modelMessage', {}),
-            'thoughts': result.get('thoughts'),
-            'metadata': {
-                'tokens': result.get('usageMetadata', {}),
-                'model': result.get('model'),
-                'provider': result.get('provider')
-            },
-            'updatedGuestLimitations': session.get('guest_limitations') if session['user']['role'] == 'guest' else None
-        })
-    else:
-        return jsonify({'success': False, 'error': result.get('error', 'Failed to send message')})
+    result = generate_ai(message_data, token)
+    return jsonify(build_message_response(result))
+
+@app.route('/api/task-status/<task_id>')
+def task_status(task_id):
+    """Get the status of a queued AI generation task"""
+    if 'user' not in session:
+        return jsonify({'success': False, 'error': 'Not authenticated'})
+    
+    if celery is None:
+        return jsonify({'success': False, 'error': 'Task queue is not configured'})
+    
+    pending_tasks = session.get('pending_tasks', [])
+    if task_id not in pending_tasks:
+        return jsonify({'success': False, 'error': 'Task not found'})
+    
+    task = celery.AsyncResult(task_id)
+    if not task.ready():
+        return jsonify({'success': True, 'pending': True, 'status': task.status})
+    
+    session['pending_tasks'] = [t for t in pending_tasks if t != task_id]
+    
+    if task.failed():
+        return jsonify({'success': False, 'error': f'Task failed: {task.result}'})
+    
+    return jsonify(build_message_response(task.result))
 
 @app.route('/api/send-message-stream', methods=['POST'])
 def send_message_stream():
@@ -434,12 +683,13 @@ def send_message_stream():
         return jsonify({'success': False, 'error': 'Not authenticated'})
     
     data = request.get_json()
+    user_id = session['user']['id']
     token = session.get('token')
     
     def generate_stream():
         try:
             message_data = {
-                'userId': session['user']['id'],
+                'userId': user_id,
                 'conversationId': data['conversationId'],
                 'contents': data['message'],
                 'model': data.get('model', 'gemini-2.5-flash'),
@@ -459,30 +709,35 @@ def send_message_stream():
                 message_data['files'] = data['files']
             
             # Make request to backend with streaming
-            import requests
-            backend_url = f"http://localhost:3000/api/ai/generate"
-            
-            response = requests.post(
-                backend_url,
+            response = _BACKEND_BREAKER.call(
+                _SESSION.request,
+                'POST',
+                f"{BACKEND_URL}/ai/generate",
                 json=message_data,
-                headers={'Authorization': f'Bearer {token}'},
-                stream=True
+                headers=auth_headers(token),
+                stream=True,
+                timeout=GENERATE_TIMEOUT
             )
             
-            if response.status_code == 200:
-                for line in response.iter_lines():
-                    if line:
-                        yield f"data: {line.decode('utf-8')}\n\n"
-            else:
-                yield f"data: {{'error': 'Failed to generate response'}}\n\n"
+            # Always release the pooled connection, including on client disconnect
+            with response:
+                if response.status_code == 200:
+                    # Backend already emits SSE framing, so forward chunks verbatim
+                    for chunk in response.iter_content(chunk_size=None):
+                        yield chunk
+                    
+                    # The new messages invalidate this user's cached history
+                    invalidate_backend_cache(token)
+                else:
+                    yield sse_event({'type': 'error', 'error': 'Failed to generate response'})
                 
         except Exception as e:
-            yield f"data: {{'error': 'Stream error: {str(e)}'}}\n\n"
+            yield sse_event({'type': 'error', 'error': f'Stream error: {str(e)}'})
         
-        yield "data: [DONE]\n\n"
+        yield b"data: [DONE]\n\n"
     
     return Response(
-        generate_stream(),
+        stream_with_context(generate_stream()),
         mimetype='text/event-stream',
         headers={
             'Cache-Control': 'no-cache',
@@ -541,12 +796,13 @@ def test_backend():
     token = session.get('token')
     user_id = session['user']['id']
     
-    # Test multiple endpoints
-    tests = {
-        'health': make_backend_request('health', 'GET'),
-        'conversations_get': make_backend_request(f'conversations?userId={user_id}&limit=5', 'GET', token=token),
-        'user_profile': make_backend_request('users/profile', 'GET', token=token)
+    # Test multiple endpoints concurrently
+    futures = {
+        'health': _EXECUTOR.submit(make_backend_request, 'health', 'GET'),
+        'conversations_get': _EXECUTOR.submit(make_backend_request, f'conversations?userId={user_id}&limit=5', 'GET', token=token),
+        'user_profile': _EXECUTOR.submit(make_backend_request, 'users/profile', 'GET', token=token)
     }
+    tests = {name: future.result() for name, future in futures.items()}
     
     return jsonify(tests)
 
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+import sys
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import app
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, content=b'{"success": true}'):
+        self.status_code = status_code
+        self.content = content
+        self.text = content.decode()
+
+
+class BackendBreakerTest(unittest.TestCase):
+    def setUp(self):
+        breaker = app.CircuitBreaker(fail_max=3, reset_timeout=30)
+        patcher = mock.patch.object(app, '_BACKEND_BREAKER', breaker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_concurrent_requests_overlap(self):
+        def slow_request(*args, **kwargs):
+            time.sleep(0.5)
+            return FakeResponse()
+        
+        with mock.patch.object(app._SESSION, 'request', side_effect=slow_request):
+            start = time.monotonic()
+            futures = [app._EXECUTOR.submit(app.make_backend_request, f'health/{i}') for i in range(3)]
+            results = [future.result() for future in futures]
+            elapsed = time.monotonic() - start
+        
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertLess(elapsed, 1.0)
+    
+    def test_application_errors_do_not_open_circuit(self):
+        response = FakeResponse(500, b'{"success": false, "error": "AI generation failed"}')
+        with mock.patch.object(app._SESSION, 'request', return_value=response):
+            for _ in range(5):
+                result = app.make_backend_request('ai/generate', 'POST', {})
+                self.assertEqual(result['error'], 'AI generation failed')
+    
+    def test_gateway_errors_open_circuit(self):
+        with mock.patch.object(app._SESSION, 'request', return_value=FakeResponse(503, b'')) as request:
+            for _ in range(3):
+                app.make_backend_request('health')
+            result = app.make_backend_request('health')
+        
+        self.assertEqual(result['error'], 'Backend unavailable')
+        self.assertEqual(request.call_count, 3)
+
+
+
+class StreamingResponse(FakeResponse):
+    def __init__(self, status_code=200):
+        super().__init__(status_code)
+        self.closed = False
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.closed = True
+    
+    def iter_content(self, chunk_size=None):
+        yield b'data: {"type": "chunk"}\n\n'
+        yield b'data: {"type": "done"}\n\n'
+
+
+class SendMessageStreamTest(unittest.TestCase):
+    def setUp(self):
+        self.client = app.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user'] = {'id': 'user-1', 'role': 'user'}
+            sess['token'] = 'token-1'
+    
+    def open_stream(self, response):
+        with mock.patch.object(app._SESSION, 'request', return_value=response):
+            return self.client.post('/api/send-message-stream',
+                                    json={'conversationId': 'conv-1', 'message': 'hi'},
+                                    buffered=False)
+    
+    def test_error_status_releases_connection(self):
+        backend_response = StreamingResponse(500)
+        body = self.open_stream(backend_response).get_data()
+        
+        self.assertIn(b'Failed to generate response', body)
+        self.assertTrue(backend_response.closed)
+    
+    def test_client_disconnect_releases_connection(self):
+        backend_response = StreamingResponse()
+        response = self.open_stream(backend_response)
+        next(iter(response.response))
+        response.close()
+        
+        self.assertTrue(backend_response.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+
+import sys
+from pathlib import Path
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app import app
+
+# WSGI entry point, e.g.:
+#   gunicorn -k gthread --threads 16 -w $(nproc) -b 0.0.0.0:3000 wsgi:app
+application = app